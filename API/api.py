@@ -1,10 +1,76 @@
 # api.py
 
-from fastapi import FastAPI
+import asyncio
+import base64
+import concurrent.futures
+import hashlib
+import io
+import queue
+import threading
+import traceback
+
+import orjson
+from cachetools import LRUCache
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 
-from renderer import render_filtered_view_base64
+from renderer import render_filtered_view_bytes, render_filtered_view_pillow_bytes
+
+
+# Rendered image bytes keyed by a hash of the request and output format
+_render_cache = LRUCache(maxsize=128)
+_render_cache_lock = threading.Lock()
+
+# Max jobs the render worker takes off the queue at once
+RENDER_BATCH_MAX = 8
+
+# (cache key, renderer kwargs, concurrent.futures.Future) tuples
+_render_queue = queue.Queue()
+
+
+def _render_worker():
+    """
+    Matplotlib isn't thread-safe, so all rendering happens here (on the
+    renderer's per-thread figure, reused between jobs). Requests that arrive while a render
+    is in progress are drained together (up to RENDER_BATCH_MAX) and
+    identical requests within a batch are rendered only once.
+    """
+    while True:
+        batch = [_render_queue.get()]
+        while len(batch) < RENDER_BATCH_MAX:
+            try:
+                batch.append(_render_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        # Futures whose request was cancelled while queued are dropped;
+        # the rest are marked running so they can no longer be cancelled
+        jobs = {}
+        for key, kwargs, future in batch:
+            if future.set_running_or_notify_cancel():
+                jobs.setdefault(key, (kwargs, []))[1].append(future)
+
+        # Never let one bad batch end the only render thread
+        try:
+            for key, (kwargs, futures) in jobs.items():
+                try:
+                    image_bytes = render_filtered_view_bytes(**kwargs)
+                except Exception as e:
+                    for future in futures:
+                        future.set_exception(e)
+                    continue
+
+                with _render_cache_lock:
+                    _render_cache[key] = image_bytes
+                for future in futures:
+                    future.set_result(image_bytes)
+        except Exception:
+            traceback.print_exc()
+
+
+threading.Thread(target=_render_worker, name="render-worker", daemon=True).start()
 
 
 class FilterModel(BaseModel):
@@ -14,18 +80,26 @@ class FilterModel(BaseModel):
 
 
 class RenderRequest(BaseModel):
-    data: Dict[str, Any]             # The CAD JSON object
+    data: Dict[str, Any]             # The CAD JSON object (optional "_id" content hash used as cache key)
     filters: Optional[FilterModel] = None
     show_background: bool = True
+    engine: Literal["matplotlib", "pillow"] = "matplotlib"
 
 
 class RenderResponse(BaseModel):
     image_base64: str
 
 
+MEDIA_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+
 app = FastAPI(
     title="CAD Renderer API",
-    description="Render filtered CAD JSON into a base64 PNG image.",
+    description="Render filtered CAD JSON into a PNG, WebP or SVG image (raw or base64).",
     version="1.0.0",
 )
 
@@ -35,17 +109,127 @@ def health_check():
     return {"status": "ok"}
 
 
+def _cache_key(req: RenderRequest, filters_dict, fmt):
+    """
+    Hash of everything that affects the rendered image. If the caller sends
+    data["_id"] (e.g. a content hash) it stands in for the full CAD JSON,
+    so large payloads don't need to be re-hashed.
+    """
+    data_id = req.data.get("_id")
+    key = {
+        "data": req.data if data_id is None else None,
+        "data_id": data_id,
+        "filters": filters_dict,
+        "show_background": req.show_background,
+        "engine": req.engine,
+        "format": fmt,
+    }
+    return hashlib.blake2b(orjson.dumps(key, option=orjson.OPT_SORT_KEYS)).digest()
+
+
+def _parse_accept(accept: str) -> Dict[str, float]:
+    """
+    Map each media range in an Accept header to its q-value (default 1).
+    """
+    ranges = {}
+    for part in accept.split(","):
+        media, *params = (p.strip() for p in part.split(";"))
+        if not media:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges[media.lower()] = q
+    return ranges
+
+
+def _negotiate_format(accept: str, engine: str) -> str:
+    """
+    Pick the output format from the Accept header: the highest q-value among
+    SVG (vector, no rasterizing; matplotlib engine only), WebP and PNG, in
+    that order on ties. SVG and WebP must be listed explicitly; PNG also
+    matches wildcards and is the fallback when nothing else is acceptable.
+    """
+    ranges = _parse_accept(accept)
+    candidates = ["svg", "webp", "png"] if engine == "matplotlib" else ["webp", "png"]
+
+    best, best_q = "png", 0.0
+    for fmt in candidates:
+        media = MEDIA_TYPES[fmt]
+        if fmt == "png":
+            q = ranges.get(media, ranges.get("image/*", ranges.get("*/*", 0.0)))
+        else:
+            q = ranges.get(media, 0.0)
+        if q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
+async def _render_image(req: RenderRequest, fmt: str = "png") -> bytes:
+    """
+    Render (or fetch from cache) the image bytes for a request.
+    """
+    filters_dict = req.filters.dict() if req.filters else None
+
+    key = _cache_key(req, filters_dict, fmt)
+    with _render_cache_lock:
+        cached = _render_cache.get(key)
+    if cached is not None:
+        return cached
+
+    kwargs = {
+        "json_path_or_data": req.data,
+        "filters": filters_dict,
+        "show_background": req.show_background,
+        "fmt": fmt,
+    }
+
+    # Pillow is thread-safe, so it doesn't need the matplotlib worker
+    if req.engine == "pillow":
+        image_bytes = await asyncio.to_thread(render_filtered_view_pillow_bytes, **kwargs)
+        with _render_cache_lock:
+            _render_cache[key] = image_bytes
+        return image_bytes
+
+    # Hand off to the render worker, which also fills the cache
+    future = concurrent.futures.Future()
+    _render_queue.put((key, kwargs, future))
+    return await asyncio.wrap_future(future)
+
+
 @app.post("/render", response_model=RenderResponse)
-def render_view(req: RenderRequest):
+async def render_view(req: RenderRequest):
     """
     Render a filtered CAD image and return base64 PNG.
     """
-    filters_dict = req.filters.dict() if req.filters else None
+    png_bytes = await _render_image(req)
+    return RenderResponse(image_base64=base64.b64encode(png_bytes).decode("utf-8"))
 
-    result = render_filtered_view_base64(
-        json_path_or_data=req.data,
-        filters=filters_dict,
-        show_background=req.show_background
-    )
 
-    return RenderResponse(**result)
+@app.post("/render.png")
+async def render_view_png(req: RenderRequest):
+    """
+    Render a filtered CAD image and return the raw PNG.
+    """
+    png_bytes = await _render_image(req)
+    return StreamingResponse(io.BytesIO(png_bytes), media_type="image/png")
+
+
+@app.post("/render.image")
+async def render_view_image(req: RenderRequest, request: Request):
+    """
+    Render a filtered CAD image in the best format the client accepts
+    (SVG, WebP or PNG).
+    """
+    fmt = _negotiate_format(request.headers.get("accept", ""), req.engine)
+    image_bytes = await _render_image(req, fmt)
+    return StreamingResponse(
+        io.BytesIO(image_bytes),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Vary": "Accept"},
+    )
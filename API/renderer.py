@@ -3,38 +3,122 @@
 import json
 import base64
 import io
+import threading
 import numpy as np
 
 import matplotlib
 # Use a non-interactive backend for servers (no GUI)
 matplotlib.use("Agg")
 
-import matplotlib.pyplot as plt
 from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox
+from PIL import Image, ImageDraw
+
+
+# Largest drawing size in inches (the axes box of the original 10x8 figure);
+# the figure is shrunk to the view's aspect so the axes fill it exactly
+VIEW_MAX_SIZE = (7.75, 6.16)
+
+
+# Encoder options per output format (Agg/Pillow); SVG needs no rasterizing
+_PNG_OPTIONS = {"compress_level": 1}
+_WEBP_OPTIONS = {"quality": 80, "method": 0}
+
+# Entity types never drawn as background geometry
+_BG_SKIP = frozenset({"INSERT", "HATCH", "MTEXT", "TEXT"})
+
+# Per-thread figure, axes and collections, reused between renders
+_canvas = threading.local()
+
+
+def _get_canvas():
+    """
+    This thread's off-screen figure, created on first use. The axes fill the
+    figure and hold three persistent collections (background lines,
+    foreground lines, hatches) whose data is swapped in for each render.
+    """
+    if not hasattr(_canvas, "fig"):
+        fig = Figure(figsize=(10, 8))
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_aspect("equal")
+        ax.axis("off")
+
+        # Data limits are set from the vertex buffers in each render
+        _canvas.lc_bg = ax.add_collection(
+            LineCollection([], colors="#888888", linewidths=1, alpha=0.5), autolim=False)
+        _canvas.lc_fg = ax.add_collection(
+            LineCollection([], colors="red", linewidths=1.2), autolim=False)
+        _canvas.pc = ax.add_collection(
+            PolyCollection([], facecolors="red", edgecolors="none", alpha=0.3), autolim=False)
+        _canvas.fig = fig
+        _canvas.ax = ax
+    return _canvas
+
+
+def _in_set(col, values):
+    """
+    Boolean mask of which items of col are in the set values. Object arrays
+    make np.isin compare every item against each value in turn, so the
+    lookup goes through the set's hash instead.
+    """
+    return np.fromiter(map(values.__contains__, col), bool, len(col))
+
+
+def _pack_points(vert_lists):
+    """
+    Copy a list of [[x, y], ...] polylines into one (total_points, 2) float64
+    buffer. Returns (buffer, per-polyline point counts).
+    """
+    seg_lens = [len(v) for v in vert_lists]
+    buf = np.empty((sum(seg_lens), 2), dtype=np.float64)
+
+    off = 0
+    for verts, k in zip(vert_lists, seg_lens):
+        buf[off:off + k] = verts
+        off += k
+
+    return buf, seg_lens
+
+
+def _pack_segments(vert_lists):
+    """
+    Pack polylines with _pack_points(). Returns (buffer, segments) where
+    segments are per-polyline views into the buffer (or a single (N, 2, 2)
+    array when every polyline is a plain two-point line).
+    """
+    buf, seg_lens = _pack_points(vert_lists)
+
+    if all(k == 2 for k in seg_lens):
+        return buf, buf.reshape(-1, 2, 2)
+    return buf, np.split(buf, np.cumsum(seg_lens)[:-1])
 
 
 def render_filtered_view_base64(json_path_or_data, filters=None, show_background=True):
     """
     Returns a base64 PNG image of the filtered CAD JSON view.
 
-    PARAMETERS
-    ----------
-    json_path_or_data : str | dict
-        Path to JSON file or already-loaded JSON dict.
+    Same parameters as render_filtered_view_bytes().
 
-    filters : dict
-        {
-            "layers": [...],
-            "types": [...],
-            "ids": [...]
-        }
+    RETURNS
+    -------
+    { "image_base64": <string> }
+    """
+    png_bytes = render_filtered_view_bytes(json_path_or_data, filters, show_background)
 
-    show_background : bool
-        If True: draw all non-text, non-insert, non-hatch geometry in gray.
+    return {
+        "image_base64": base64.b64encode(png_bytes).decode("utf-8")
+    }
+
+
+def _collect_geometry(json_path_or_data, filters, show_background):
+    """
+    Load the CAD JSON and select what to draw.
 
     RETURNS
     -------
-    { "image_base64": <string> }
+    (bg_segs, fg_segs, hatch_regions), each a list of [[x, y], ...] vertex lists.
+    bg_segs is empty when show_background is False or no filter is active.
     """
 
     # Load JSON if needed
@@ -52,72 +136,221 @@ def render_filtered_view_base64(json_path_or_data, filters=None, show_background
     filter_types = set(filters.get("types") or [])
     filter_ids = set(filters.get("ids") or [])
 
-    def is_filtered(e):
-        """True if entity matches ANY filter provided."""
-        ok_layer = (not filter_layers) or (e.get("layer") in filter_layers)
-        ok_type  = (not filter_types)  or (e.get("type") in filter_types)
-        ok_id    = (not filter_ids)    or (str(e.get("id")) in filter_ids)
-        return ok_layer and ok_type and ok_id
+    # Entity types as a column, so type checks are vectorized
+    n = len(entities)
+    types_arr = np.array([e.get("type") for e in entities], dtype=object)
 
-    # Create figure off-screen
-    fig, ax = plt.subplots(figsize=(10, 8))
-    ax.set_aspect("equal")
-    ax.axis("off")
-
-    # ======================================================
-    # BACKGROUND (gray)
-    # ======================================================
-    if show_background:
-        bg_segs = []
-        for e in entities:
-            if e.get("type") in ("INSERT", "HATCH", "MTEXT", "TEXT"):
-                continue
+    # Indices of entities matching every filter provided. Filters are applied
+    # smallest set first, and each later column is only built for the
+    # entities still matching (e.g. a handful of ids skips the layer column)
+    active = sorted(
+        (f for f in (("layers", filter_layers), ("types", filter_types), ("ids", filter_ids)) if f[1]),
+        key=lambda f: len(f[1]),
+    )
+    fg_idx = np.arange(n)
+    for name, values in active:
+        if not fg_idx.size:
+            break
+        if name == "types":
+            col = types_arr[fg_idx]
+        elif name == "layers":
+            col = np.array([entities[i].get("layer") for i in fg_idx], dtype=object)
+        else:
+            col = np.array([str(entities[i].get("id")) for i in fg_idx], dtype=object)
+        fg_idx = fg_idx[_in_set(col, values)]
 
-            verts = e.get("vertices")
+    # BACKGROUND: all non-text, non-insert, non-hatch geometry. Skipped when
+    # no filter is active: the foreground then contains every background
+    # line, drawn on top of it with a wider stroke, so it would never show
+    has_filter = bool(filter_layers or filter_types or filter_ids)
+    bg_segs = []
+    if show_background and has_filter:
+        bg_mask = ~_in_set(types_arr, _BG_SKIP)
+        for i in bg_mask.nonzero()[0]:
+            verts = entities[i].get("vertices")
             if verts and len(verts) > 1:
-                bg_segs.append(np.array(verts))
-
-        if bg_segs:
-            lc_bg = LineCollection(bg_segs, colors="#888888", linewidths=1, alpha=0.5)
-            ax.add_collection(lc_bg)
+                bg_segs.append(verts)
 
-    # ======================================================
-    # FOREGROUND (filtered, red)
-    # ======================================================
+    # FOREGROUND: filtered geometry and hatches
     fg_segs = []
     hatch_regions = []
 
-    for e in entities:
-        if not is_filtered(e):
-            continue
-
-        if e.get("type") == "HATCH" and "vertices" in e:
-            hatch_regions.append(np.array(e["vertices"]))
+    for i in fg_idx:
+        e = entities[i]
+        if types_arr[i] == "HATCH" and "vertices" in e:
+            hatch_regions.append(e["vertices"])
             continue
 
         verts = e.get("vertices")
         if verts and len(verts) > 1:
-            fg_segs.append(np.array(verts))
+            fg_segs.append(verts)
 
-    if fg_segs:
-        lc_fg = LineCollection(fg_segs, colors="red", linewidths=1.2)
-        ax.add_collection(lc_fg)
+    return bg_segs, fg_segs, hatch_regions
 
-    if hatch_regions:
-        pc = PolyCollection(hatch_regions, facecolors="red", edgecolors="none", alpha=0.3)
-        ax.add_collection(pc)
 
-    ax.autoscale()
+def render_filtered_view_bytes(json_path_or_data, filters=None, show_background=True, fmt="png"):
+    """
+    Returns the image bytes of the filtered CAD JSON view.
+
+    PARAMETERS
+    ----------
+    json_path_or_data : str | dict
+        Path to JSON file or already-loaded JSON dict.
+
+    filters : dict
+        {
+            "layers": [...],
+            "types": [...],
+            "ids": [...]
+        }
+
+    show_background : bool
+        If True: draw all non-text, non-insert, non-hatch geometry in gray
+        (only visible when a filter is given; unfiltered views are all red).
 
+    fmt : str
+        "png", "webp" or "svg".
+
+    RETURNS
+    -------
+    bytes (image in the requested format)
+    """
+
+    bg_segs, fg_segs, hatch_regions = _collect_geometry(json_path_or_data, filters, show_background)
+
+    # Reuse this thread's figure off-screen
+    canvas = _get_canvas()
+    fig, ax = canvas.fig, canvas.ax
+
+    bg_buf, bg_lines = _pack_segments(bg_segs)
+    fg_buf, fg_lines = _pack_segments(fg_segs)
+    hatch_buf, _ = _pack_points(hatch_regions)
+
+    # ======================================================
+    # BACKGROUND (gray)
     # ======================================================
-    # Convert figure → PNG → base64
+    canvas.lc_bg.set_segments(bg_lines)
+
+    # ======================================================
+    # FOREGROUND (filtered, red)
+    # ======================================================
+    canvas.lc_fg.set_segments(fg_lines)
+    canvas.pc.set_verts(hatch_regions)
+
+    # Data limits straight from the vertex buffers, then autoscale
+    ax.dataLim.set(Bbox.null())
+    ax.ignore_existing_data_limits = True
+    for pts in (bg_buf, fg_buf, hatch_buf):
+        if len(pts):
+            ax.update_datalim(pts)
+    ax.viewLim.set(Bbox.unit())  # default view when there's nothing to draw
+    ax.autoscale_view()
+
+    # Fit the figure to the view instead of bbox_inches="tight", which
+    # renders everything twice just to measure the bbox
+    (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+    scale = min(VIEW_MAX_SIZE[0] / (x1 - x0), VIEW_MAX_SIZE[1] / (y1 - y0))
+    # Each side is at least one pixel: a straight horizontal or vertical
+    # drawing would otherwise round to an empty image, which savefig rejects
+    fig.set_size_inches(max((x1 - x0) * scale, 1 / 150), max((y1 - y0) * scale, 1 / 150))
+
+    # ======================================================
+    # Convert figure → image bytes
     # ======================================================
     buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=150, bbox_inches="tight", transparent=False)
-    plt.close(fig)
+    if fmt == "svg":
+        fig.savefig(buf, format="svg", dpi=150, pad_inches=0)
+    else:
+        pil_kwargs = _WEBP_OPTIONS if fmt == "webp" else _PNG_OPTIONS
+        fig.savefig(buf, format=fmt, dpi=150, pad_inches=0, pil_kwargs=pil_kwargs)
 
-    image_base64 = base64.b64encode(buf.getvalue()).decode("utf-8")
+    # Don't keep this view's geometry alive between renders
+    canvas.lc_bg.set_segments([])
+    canvas.lc_fg.set_segments([])
+    canvas.pc.set_verts([])
 
-    return {
-        "image_base64": image_base64
-    }
+    return buf.getvalue()
+
+
+# Pillow output geometry, matching the matplotlib view at 150 dpi
+PIL_MAX_SIZE = (round(VIEW_MAX_SIZE[0] * 150), round(VIEW_MAX_SIZE[1] * 150))
+PIL_PAD = 15
+
+# matplotlib colors pre-blended onto white (gray @ alpha 0.5) and line
+# widths converted from points at 150 dpi
+PIL_BG_COLOR = (196, 196, 196)
+PIL_FG_COLOR = (255, 0, 0)
+PIL_HATCH_COLOR = (255, 0, 0, 77)
+PIL_BG_WIDTH = 2
+PIL_FG_WIDTH = 2
+
+
+def render_filtered_view_pillow_bytes(json_path_or_data, filters=None, show_background=True, fmt="png"):
+    """
+    Returns the image bytes of the filtered CAD JSON view, drawn directly
+    with Pillow instead of matplotlib. Same parameters and colors as
+    render_filtered_view_bytes() (fmt: "png" or "webp" only); much cheaper
+    for large drawings since the output is only straight segments and
+    filled polygons. Unlike matplotlib, overlapping hatches share one
+    translucent layer instead of stacking.
+    """
+    bg_segs, fg_segs, hatch_regions = _collect_geometry(json_path_or_data, filters, show_background)
+
+    # All points in one buffer → bbox and pixel transform in single passes
+    buf, seg_lens = _pack_points(bg_segs + fg_segs + hatch_regions)
+
+    max_w, max_h = PIL_MAX_SIZE
+    if buf.shape[0] == 0:
+        img = Image.new("RGB", (max_w + 2 * PIL_PAD, max_h + 2 * PIL_PAD), "white")
+        return _encode_pillow(img, fmt)
+
+    mn = buf.min(axis=0)
+    mx = buf.max(axis=0)
+    span = mx - mn
+    scale = min(max_w / span[0] if span[0] > 0 else np.inf,
+                max_h / span[1] if span[1] > 0 else np.inf)
+    if not np.isfinite(scale):
+        scale = 1.0
+
+    width = int(np.ceil(span[0] * scale)) + 2 * PIL_PAD
+    height = int(np.ceil(span[1] * scale)) + 2 * PIL_PAD
+
+    # Data → pixel affine (y axis flipped)
+    A = np.array([[scale, 0.0], [0.0, -scale]])
+    t = np.array([PIL_PAD - mn[0] * scale, PIL_PAD + mx[1] * scale])
+    px = buf @ A + t
+
+    pieces = np.split(px, np.cumsum(seg_lens)[:-1]) if seg_lens else []
+    n_bg = len(bg_segs)
+    n_fg = len(fg_segs)
+
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+
+    for seg in pieces[:n_bg]:
+        draw.line(seg.ravel().tolist(), fill=PIL_BG_COLOR, width=PIL_BG_WIDTH)
+
+    for seg in pieces[n_bg:n_bg + n_fg]:
+        draw.line(seg.ravel().tolist(), fill=PIL_FG_COLOR, width=PIL_FG_WIDTH)
+
+    # Hatches are translucent, so draw them on an overlay and composite
+    hatch_px = [p for p in pieces[n_bg + n_fg:] if p.shape[0] > 2]
+    if hatch_px:
+        overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
+        odraw = ImageDraw.Draw(overlay)
+        for poly in hatch_px:
+            odraw.polygon(poly.ravel().tolist(), fill=PIL_HATCH_COLOR)
+        img = Image.alpha_composite(img.convert("RGBA"), overlay).convert("RGB")
+
+    return _encode_pillow(img, fmt)
+
+
+def _encode_pillow(img, fmt):
+    if fmt not in ("png", "webp"):
+        raise ValueError(f"Pillow engine can't encode {fmt!r}")
+    out = io.BytesIO()
+    if fmt == "webp":
+        img.save(out, "WEBP", **_WEBP_OPTIONS)
+    else:
+        img.save(out, "PNG", **_PNG_OPTIONS)
+    return out.getvalue()
@@ -1,33 +1,74 @@
 import json
 import ezdxf
-import math
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from ezdxf import path
 from ezdxf.colors import int2rgb
+from itertools import repeat
 from pathlib import Path
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to the NumPy helpers
+    njit = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
 
 # =============================================================
 # MATH HELPERS
 # =============================================================
 def calculate_length(vertices):
-    if not vertices or len(vertices) < 2: return 0.0
-    total_length = 0.0
-    for i in range(len(vertices) - 1):
-        x1, y1 = vertices[i]
-        x2, y2 = vertices[i + 1]
-        total_length += math.hypot(x2 - x1, y2 - y1)
-    return round(total_length, 4)
+    """Polyline length of an (N, 2) float64 vertex array."""
+    if vertices.shape[0] < 2: return 0.0
+    total_length = np.hypot(np.diff(vertices[:, 0]), np.diff(vertices[:, 1])).sum()
+    return round(float(total_length), 4)
 
 
 def calculate_area(vertices):
-    if not vertices or len(vertices) < 3: return 0.0
-    area = 0.0
-    n = len(vertices)
-    for i in range(n):
-        j = (i + 1) % n
-        area += vertices[i][0] * vertices[j][1]
-        area -= vertices[j][0] * vertices[i][1]
-    return round(abs(area) / 2.0, 4)
+    """Shoelace area of an (N, 2) float64 vertex array."""
+    if vertices.shape[0] < 3: return 0.0
+    # Shift to the first vertex so large drawing coordinates don't cancel out
+    local = vertices - vertices[0]
+    x = local[:, 0]
+    y = local[:, 1]
+    area = np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))
+    return round(abs(float(area)) / 2.0, 4)
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _len_area(arr):
+        n = arr.shape[0]
+        length = 0.0
+        area = 0.0
+        if n < 2: return length, area
+        x0 = arr[0, 0]
+        y0 = arr[0, 1]
+        for i in range(n - 1):
+            dx = arr[i + 1, 0] - arr[i, 0]
+            dy = arr[i + 1, 1] - arr[i, 1]
+            length += np.sqrt(dx * dx + dy * dy)
+            # Shoelace relative to the first vertex (closing edge contributes 0)
+            area += (arr[i, 0] - x0) * (arr[i + 1, 1] - y0) - (arr[i + 1, 0] - x0) * (arr[i, 1] - y0)
+        if n < 3: area = 0.0
+        return length, abs(area) / 2.0
+
+    # Compile (or load from cache) once at import instead of on the first entity
+    _len_area(np.zeros((3, 2), dtype=np.float64))
+else:
+    _len_area = None
+
+
+def calculate_length_area(vertices):
+    """(length, area) of an (N, 2) float64 vertex array, via Numba when available."""
+    if _len_area is None:
+        return calculate_length(vertices), calculate_area(vertices)
+    length, area = _len_area(np.ascontiguousarray(vertices))
+    return round(length, 4), round(area, 4)
 
 
 # =============================================================
@@ -44,10 +85,11 @@ def get_layer_hex(doc, layer_name):
 
 
 def get_entity_hex(entity):
-    if entity.dxf.hasattr("true_color"):
-        rgb = int2rgb(entity.dxf.true_color)
+    dxf = entity.dxf
+    if dxf.hasattr("true_color"):
+        rgb = int2rgb(dxf.true_color)
         return "#{:02x}{:02x}{:02x}".format(*rgb)
-    c = entity.dxf.color
+    c = dxf.color
     if c == 256: return None
     return _aci_to_hex(c)
 
@@ -58,88 +100,129 @@ def _aci_to_hex(aci):
     return "#{:02x}{:02x}{:02x}".format(*rgb)
 
 
+def _json_default(obj):
+    if isinstance(obj, np.ndarray):
+        # float32 -> float64 picks up binary noise (1.1 -> 1.100000023841858)
+        if obj.dtype == np.float32: return obj.astype(np.float64).round(OUTPUT_DECIMALS).tolist()
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def write_json(data, json_path):
+    if orjson is not None:
+        Path(json_path).write_bytes(
+            orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        )
+        return
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=_json_default)
+
+
+FLATTEN_TOLERANCE = 0.05
+
+# Decimals kept for centered modelspace coordinates in the output
+OUTPUT_DECIMALS = 4
+
+
+def _text_to_json(entity, data, unit_name):
+    dxf = entity.dxf
+    is_mtext = data["type"] == 'MTEXT'
+
+    content = entity.plain_text() if is_mtext else dxf.text
+    if not content or content.strip() == "": return None
+
+    insert = dxf.get('insert')
+    if insert is None: return None
+
+    data.update({
+        "text": content,
+        "insert": [insert.x, insert.y],
+        "rotation": dxf.rotation,  # every text type defines rotation (DXF default 0)
+        # Get text height from DXF (MTEXT stores it as char_height)
+        "height": dxf.get('char_height' if is_mtext else 'height', 1.0)
+    })
+    return data
+
+
+def _insert_to_json(entity, data, unit_name):
+    dxf = entity.dxf
+    get = dxf.get
+    insert = dxf.insert
+
+    data.update({
+        "block_name": dxf.name,
+        "insert": [insert.x, insert.y],
+        "rotation": dxf.rotation,
+        "scale": [get('xscale', 1.0), get('yscale', 1.0), get('zscale', 1.0)],
+        "attributes": []
+    })
+
+    if entity.attribs:
+        for attrib in entity.attribs:
+            # Pass unit_name recursively
+            attr_data = entity_to_json(attrib, unit_name)
+            if attr_data: data["attributes"].append(attr_data)
+    return data
+
+
+# make_path() is a singledispatch function; types without a registered
+# converter (POINT, DIMENSION, ...) fall through to this implementation
+_MAKE_PATH_UNSUPPORTED = path.make_path.registry[object]
+
+
+def _geometry_to_json(entity, data, unit_name):
+    if path.make_path.dispatch(type(entity)) is _MAKE_PATH_UNSUPPORTED: return None
+
+    try:
+        p = path.make_path(entity)
+        vertices = list(p.flattening(FLATTEN_TOLERANCE))
+    except (AttributeError, TypeError, ezdxf.DXFError, ValueError):
+        return None  # malformed geometry, or a mesh POLYLINE make_path can't convert
+    if not vertices: return None
+
+    arr = np.asarray([[v.x, v.y] for v in vertices], dtype=np.float64)
+
+    # --- DYNAMIC UNIT KEYS ---
+    len_key = f"length ({unit_name})"
+    area_key = f"area ({unit_name}^2)"
+
+    data[len_key], data[area_key] = calculate_length_area(arr)
+    # -------------------------
+
+    data["vertices"] = arr
+    data["vertex_count"] = arr.shape[0]
+    return data
+
+
+# Type-specific handlers; anything not listed goes through path flattening
+# (Lines, Polylines, Hatches, ...)
+_HANDLERS = {
+    'TEXT': _text_to_json,
+    'MTEXT': _text_to_json,
+    'ATTRIB': _text_to_json,
+    'ATTDEF': _text_to_json,
+    'INSERT': _insert_to_json,
+}
+
+
 def entity_to_json(entity, unit_name="Unitless"):
     """
     Now accepts unit_name to format keys dynamically.
     """
-
-    flatten_tolerance = 0.05
-
+    dxf = entity.dxf
+    get = dxf.get
     dxftype = entity.dxftype()
-    hex_color = get_entity_hex(entity)
-    linetype = entity.dxf.get('linetype', 'Continuous')
-    lineweight = entity.dxf.get('lineweight', -1)
 
     data = {
         "type": dxftype,
-        "layer": entity.dxf.layer,
-        "color_hex": hex_color,
-        "linetype": linetype,
-        "lineweight": lineweight,
-        "id": entity.dxf.handle,
+        "layer": dxf.layer,
+        "color_hex": get_entity_hex(entity),
+        "linetype": get('linetype', 'Continuous'),
+        "lineweight": get('lineweight', -1),
+        "id": dxf.handle,
     }
 
-    # --- TEXT ---
-    if dxftype in ['TEXT', 'MTEXT', 'ATTRIB', 'ATTDEF']:
-        try:
-            content = entity.plain_text() if dxftype == 'MTEXT' else entity.dxf.text
-            insert = entity.dxf.insert
-            rotation = entity.dxf.rotation if hasattr(entity.dxf, 'rotation') else 0.0
-            height = entity.dxf.get('height', 1.0)  # Get text height from DXF
-
-            if not content or content.strip() == "": return None
-
-            data.update({
-                "text": content,
-                "insert": [insert.x, insert.y],
-                "rotation": rotation,
-                "height": height  # Include text height in JSON output
-            })
-            return data
-        except:
-            return None
-
-    # --- BLOCKS / INSERTS ---
-    if dxftype == 'INSERT':
-        sx = entity.dxf.get('xscale', 1.0)
-        sy = entity.dxf.get('yscale', 1.0)
-        sz = entity.dxf.get('zscale', 1.0)
-
-        data.update({
-            "block_name": entity.dxf.name,
-            "insert": [entity.dxf.insert.x, entity.dxf.insert.y],
-            "rotation": entity.dxf.rotation,
-            "scale": [sx, sy, sz],
-            "attributes": []
-        })
-
-        if entity.attribs:
-            for attrib in entity.attribs:
-                # Pass unit_name recursively
-                attr_data = entity_to_json(attrib, unit_name)
-                if attr_data: data["attributes"].append(attr_data)
-        return data
-
-    # --- GEOMETRY (Lines, Polylines, Hatches) ---
-    try:
-        p = path.make_path(entity)
-        vertices = list(p.flattening(flatten_tolerance))
-        v_list = [[v.x, v.y] for v in vertices]
-        if not v_list: return None
-
-        # --- DYNAMIC UNIT KEYS ---
-        len_key = f"length ({unit_name})"
-        area_key = f"area ({unit_name}^2)"
-
-        data[len_key] = calculate_length(v_list)
-        data[area_key] = calculate_area(v_list)
-        # -------------------------
-
-        data["vertices"] = v_list
-        data["vertex_count"] = len(v_list)
-        return data
-    except:
-        return None
+    return _HANDLERS.get(dxftype, _geometry_to_json)(entity, data, unit_name)
 
 
 # =============================================================
@@ -212,33 +295,40 @@ def parse_dxf(filepath):
         if e_data: entities.append(e_data)
 
     # 4. Offset Calculation
-    all_x, all_y = [], []
-    for e in entities:
-        if "vertices" in e:
-            for x, y in e["vertices"]:
-                all_x.append(x);
-                all_y.append(y)
-        elif "insert" in e:
-            all_x.append(e["insert"][0]);
-            all_y.append(e["insert"][1])
+    # One (P, 2) buffer holds every vertex, then every standalone insert
+    # point, then every block attribute insert. The math runs in float64
+    # (raw drawing coordinates are far too large for float32); entities keep
+    # views into a float32 copy that is filled once the points are centered
+    vert_entities = [e for e in entities if "vertices" in e]
+    insert_owners = [e for e in entities if "vertices" not in e and "insert" in e]
+    attr_owners = [a for e in entities if e["type"] == "INSERT" for a in e.get("attributes", ())]
+
+    n_verts = sum(e["vertex_count"] for e in vert_entities)
+    n_bbox = n_verts + len(insert_owners)  # attribute inserts don't count toward the extents
+    pts = np.empty((n_bbox + len(attr_owners), 2), dtype=np.float64)
+    pts32 = np.empty(pts.shape, dtype=np.float32)
+
+    start = 0
+    for e in vert_entities:
+        end = start + e["vertex_count"]
+        pts[start:end] = e["vertices"]
+        e["vertices"] = pts32[start:end]
+        start = end
+    for i, e in enumerate(insert_owners + attr_owners, start=n_verts):
+        pts[i] = e["insert"]
+        e["insert"] = pts32[i]
 
     offset = {"x": 0, "y": 0}
-    if all_x:
-        cx = (min(all_x) + max(all_x)) / 2
-        cy = (min(all_y) + max(all_y)) / 2
-        offset = {"x": -cx, "y": -cy}
-
-    # 5. Apply Offset
-    for e in entities:
-        if "vertices" in e:
-            e["vertices"] = [[x + offset["x"], y + offset["y"]] for x, y in e["vertices"]]
-        if "insert" in e:
-            e["insert"][0] += offset["x"]
-            e["insert"][1] += offset["y"]
-        if e["type"] == "INSERT" and "attributes" in e:
-            for attr in e["attributes"]:
-                attr["insert"][0] += offset["x"]
-                attr["insert"][1] += offset["y"]
+    if n_bbox:
+        mn = pts[:n_bbox].min(axis=0)
+        mx = pts[:n_bbox].max(axis=0)
+        center = (mn + mx) * 0.5
+        offset = {"x": float(-center[0]), "y": float(-center[1])}
+
+    # 5. Apply Offset, round to output precision, store (entity views see it)
+    pts += (offset["x"], offset["y"])
+    pts.round(OUTPUT_DECIMALS, out=pts)
+    pts32[...] = pts
 
     return {
         "filename": filepath.name,
@@ -251,6 +341,28 @@ def parse_dxf(filepath):
     }
 
 
+# =============================================================
+# CLI
+# =============================================================
+def _process_one(dxf_path, output_dir):
+    """Convert one DXF; returns (status, message) with status in converted/skipped/failed."""
+    json_path = output_dir / f"{dxf_path.stem}.json"
+
+    if json_path.exists():
+        return "skipped", f"⏭  Skipping (already exists): {json_path.name}"
+
+    try:
+        data = parse_dxf(dxf_path)
+        if not data:
+            return "failed", f"❌ Failed to parse: {dxf_path.name}"
+
+        write_json(data, json_path)
+        return "converted", f"✅ Saved: {json_path.name}"
+
+    except Exception as e:
+        return "failed", f"❌ Error processing {dxf_path.name}: {e}"
+
+
 if __name__ == "__main__":
     OUTPUT_DIR = Path("JSONs")
     DXF_DIR = Path("DXFs")
@@ -262,36 +374,16 @@ if __name__ == "__main__":
         print("No DXF files found in DXFs/")
         exit(0)
 
-    converted = 0
-    skipped = 0
-    failed = 0
-
-    for dxf_path in dxf_files:
-        json_path = OUTPUT_DIR / f"{dxf_path.stem}.json"
-
-        if json_path.exists():
-            print(f"⏭  Skipping (already exists): {json_path.name}")
-            skipped += 1
-            continue
-
-        try:
-            data = parse_dxf(dxf_path)
-            if not data:
-                print(f"❌ Failed to parse: {dxf_path.name}")
-                failed += 1
-                continue
-
-            with open(json_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-
-            print(f"✅ Saved: {json_path.name}")
-            converted += 1
+    counts = {"converted": 0, "skipped": 0, "failed": 0}
 
-        except Exception as e:
-            print(f"❌ Error processing {dxf_path.name}: {e}")
-            failed += 1
+    # Files are independent, so parse them in parallel; each worker writes its own JSON
+    with ProcessPoolExecutor() as executor:
+        results = executor.map(_process_one, dxf_files, repeat(OUTPUT_DIR), chunksize=1)
+        for status, message in results:
+            print(message)
+            counts[status] += 1
 
     print("\n--- Summary ---")
-    print(f"Converted: {converted}")
-    print(f"Skipped:   {skipped}")
-    print(f"Failed:    {failed}")
+    print(f"Converted: {counts['converted']}")
+    print(f"Skipped:   {counts['skipped']}")
+    print(f"Failed:    {counts['failed']}")
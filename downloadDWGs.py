@@ -1,5 +1,7 @@
 import os
-import requests
+import asyncio
+import aiohttp
+import aiofiles
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
@@ -7,55 +9,92 @@ BASE_PAGE = "https://afd.calpoly.edu/facilities/campus-maps/building-floor-plans
 BASE_URL = "https://afd.calpoly.edu"
 OUTPUT_DIR = "DWGs"
 
+# Max downloads in flight (also the connection pool size)
+MAX_CONCURRENT = 16
+CHUNK_SIZE = 65536
+
+# Limits on connecting and on each read; large files may take longer overall
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(sock_connect=30, sock_read=60)
+
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
 }
 
-print("Fetching page...")
-response = requests.get(BASE_PAGE, headers=HEADERS, timeout=30)
-response.raise_for_status()
-
-soup = BeautifulSoup(response.text, "html.parser")
-
-# Collect DWG links
-dwg_links = []
-for a in soup.find_all("a", href=True):
-    href = a["href"]
-    if href.lower().endswith(".dwg"):
-        dwg_links.append(urljoin(BASE_URL, href))
-
-print(f"Found {len(dwg_links)} DWG files")
-
-failed = []
 
-for i, url in enumerate(dwg_links, start=1):
+async def fetch(session, sem, url, i, total, failed):
     filename = os.path.basename(url)
     output_path = os.path.join(OUTPUT_DIR, filename)
 
     # Skip already downloaded files
     if os.path.exists(output_path):
-        print(f"[{i}/{len(dwg_links)}] Skipping existing: {filename}")
-        continue
-
-    print(f"[{i}/{len(dwg_links)}] Downloading {filename}...")
-
-    try:
-        with requests.get(url, headers=HEADERS, stream=True, timeout=60) as r:
-            if r.status_code != 200:
-                print(f"  ⚠️  Failed ({r.status_code})")
-                failed.append((filename, r.status_code))
-                continue
-
-            with open(output_path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-
-    except requests.exceptions.RequestException as e:
-        print(f"  ❌ Error: {e}")
-        failed.append((filename, str(e)))
+        print(f"[{i}/{total}] Skipping existing: {filename}")
+        return
+
+    async with sem:
+        print(f"[{i}/{total}] Downloading {filename}...")
+
+        # Stream to a .part file so an interrupted download is never
+        # mistaken for a finished one by the skip check above
+        part_path = output_path + ".part"
+        try:
+            async with session.get(url, timeout=DOWNLOAD_TIMEOUT) as r:
+                if r.status != 200:
+                    print(f"  ⚠️  Failed ({r.status}): {filename}")
+                    failed.append((filename, r.status))
+                    return
+
+                async with aiofiles.open(part_path, "wb") as f:
+                    async for chunk in r.content.iter_chunked(CHUNK_SIZE):
+                        await f.write(chunk)
+
+            os.replace(part_path, output_path)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            print(f"  ❌ Error ({filename}): {e}")
+            failed.append((filename, str(e)))
+
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+
+async def main():
+    # One session = one pooled keep-alive connector for every request
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT, keepalive_timeout=30)
+    async with aiohttp.ClientSession(headers=HEADERS, connector=connector) as session:
+        print("Fetching page...")
+        async with session.get(BASE_PAGE, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            response.raise_for_status()
+            html = await response.text()
+
+        soup = BeautifulSoup(html, "html.parser")
+
+        # Collect DWG links
+        dwg_links = []
+        for a in soup.find_all("a", href=True):
+            href = a["href"]
+            if href.lower().endswith(".dwg"):
+                dwg_links.append(urljoin(BASE_URL, href))
+
+        # The page can link the same file more than once; concurrent tasks
+        # would otherwise download it into the same .part file
+        dwg_links = list(dict.fromkeys(dwg_links))
+
+        print(f"Found {len(dwg_links)} DWG files")
+
+        failed = []
+        sem = asyncio.Semaphore(MAX_CONCURRENT)
+        await asyncio.gather(*(
+            fetch(session, sem, url, i, len(dwg_links), failed)
+            for i, url in enumerate(dwg_links, start=1)
+        ))
+
+    return failed
+
+
+failed = asyncio.run(main())
 
 # Write failures to a log file
 if failed: